@@ -3,15 +3,18 @@ import json
 import traceback
 import logging
 from pathlib import Path
-from os import access as check_access, R_OK
+from os import access as check_access, scandir, R_OK
 from os.path import expandvars, expanduser
 from socket import gethostname
 from uuid import uuid4
 from collections import defaultdict
+from functools import lru_cache
 
 
+@lru_cache(maxsize=1)
 def get_current_server():
-    """Return the current server name by looking at the hostname
+    """Return the current server name by looking at the hostname, the
+    result is cached for the lifetime of the process
 
     Returns:
         (str): one of `bigsky`, `biowulf`, or `locus`
@@ -68,6 +71,7 @@ SNAKEFILE = {
 remote_resource_confg = Path(Path(__file__).parent, '..', 'config', 'remote.json').absolute()
 
 
+@lru_cache(maxsize=1)
 def get_resource_config():
     """Return a dictionary containing server specific references utilized in 
     the workflow for directories or reference files.
@@ -110,6 +114,7 @@ def base_config(keys=None, qc=True, slurm_id=None):
     return this_config
 
 
+@lru_cache(maxsize=1)
 def get_biowulf_seq_dirs():
     """Get a list of sequence directories, that have the required illumnia file artifacts:
     RTAComplete.txt - breadcrumb file created by bigsky transfer process and illumnia sequencing
@@ -121,9 +126,16 @@ def get_biowulf_seq_dirs():
     transfer_breadcrumb = "RTAComplete.txt"
     if not top_dir.exists():
         return None
-    return [xx for x in top_dir.iterdir() if x.is_dir() for xx in x.iterdir() if xx.is_dir() and Path(xx, transfer_breadcrumb).exists()]
+    seq_dirs = []
+    with scandir(top_dir) as top_children:
+        for this_dir in top_children:
+            if not this_dir.is_dir(): continue
+            with scandir(this_dir.path) as run_dirs:
+                seq_dirs.extend(Path(xx.path) for xx in run_dirs if xx.is_dir() and Path(xx.path, transfer_breadcrumb).exists())
+    return seq_dirs
 
 
+@lru_cache(maxsize=1)
 def get_bigsky_seq_dirs():
     """Get a list of sequence directories, that have the required illumnia file artifacts:
     RTAComplete.txt - breadcrumb file created by bigsky transfer process and illumnia sequencing
@@ -136,19 +148,21 @@ def get_bigsky_seq_dirs():
     if not top_dir.exists():
         return None
     seq_dirs = []
-    for this_dir in top_dir.iterdir():
-        if not this_dir.is_dir(): continue
-        for this_child_elem in this_dir.iterdir():
-            try:
-                elem_checks = [
-                    this_child_elem.is_dir(), 
-                    Path(this_child_elem, transfer_breadcrumb).exists(),
-                    check_access(this_child_elem, R_OK)
-                ]
-            except (PermissionError, FileNotFoundError) as error:
-                continue
-            if all(elem_checks):
-                seq_dirs.append(this_child_elem.absolute())
+    # DirEntry.is_dir() is answered from the directory listing, and
+    # entry paths under the absolute top_dir are already absolute
+    with scandir(top_dir) as top_children:
+        for this_dir in top_children:
+            if not this_dir.is_dir(): continue
+            with scandir(this_dir.path) as run_dirs:
+                for this_child_elem in run_dirs:
+                    try:
+                        elem_check = this_child_elem.is_dir() and \
+                            Path(this_child_elem.path, transfer_breadcrumb).exists() and \
+                            check_access(this_child_elem.path, R_OK)
+                    except (PermissionError, FileNotFoundError) as error:
+                        continue
+                    if elem_check:
+                        seq_dirs.append(Path(this_child_elem.path))
     return seq_dirs
 
 
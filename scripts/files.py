@@ -5,8 +5,9 @@
 # ~~~~~~~~~~~~~~~
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from os import access as check_access, R_OK, W_OK
-from functools import partial
+from os import access as check_access, scandir, R_OK, W_OK
+from functools import partial, lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from .samplesheet import IllumniaSampleSheet
 from .config import get_current_server, GENOME_CONFIGS, DIRECTORY_CONFIGS
 
@@ -17,21 +18,25 @@ def get_all_seq_dirs(top_dir, server):
         This is tightly coupled at the moment to the directory that is on RML-BigSky.
         In the future will need to the take a look at how to do this more generally
     """
-    if isinstance(top_dir, str): top_dir = Path(top_dir)
+    # resolve the root once, entries listed beneath it are already canonical
+    top_dir = Path(top_dir).resolve()
     _dirs = []
-    for _file in top_dir.glob('*'):
-        if _file.is_dir():
-            for _file2 in _file.glob('*'):
-                if _file2.is_dir() and check_access(_file2, R_OK):
-                    _dirs.append(_file2.resolve())
+    with scandir(top_dir) as top_children:
+        for _file in top_children:
+            if not _file.is_dir(): continue
+            with scandir(_file.path) as run_dirs:
+                for _file2 in run_dirs:
+                    if _file2.is_dir() and check_access(_file2.path, R_OK):
+                        _dirs.append(Path(_file2.path))
     # check if directory is processed or not
     return _dirs
 
 
 def check_if_demuxed(data_dir):
     do_demuxed = True
-    if Path(data_dir, 'Analysis').exists():
-        if list(Path(data_dir, 'Analysis').rglob('*.fastq*')):
+    analysis_dir = Path(data_dir, 'Analysis')
+    if analysis_dir.exists():
+        if list(analysis_dir.rglob('*.fastq*')):
             do_demuxed = False
     return do_demuxed
 
@@ -85,25 +90,17 @@ def runid2samplesheet(runid, top_dir=DIRECTORY_CONFIGS['bigsky']['seq']):
     ss_path = Path(top_dir, runid)
     if not ss_path.exists():
         raise FileNotFoundError(f"Run directory does not exist: {ss_path}")
-    if Path(ss_path, f"SampleSheet.txt").exists():
-        ss_path = Path(ss_path, f"SampleSheet.txt")
-    elif Path(ss_path, f"SampleSheet.csv").exists():
-        ss_path = Path(ss_path, f"SampleSheet.csv")
-    elif Path(ss_path, f"SampleSheet_{runid}.txt").exists():
-        ss_path = Path(ss_path, f"SampleSheet_{runid}.txt")
-    elif Path(ss_path, f"SampleSheet_{runid}.csv").exists():
-        ss_path = Path(ss_path, f"SampleSheet_{runid}.csv")
-    else:
-        raise FileNotFoundError("Run sample sheet does not exist: " + str(ss_path) + f"/SampleSheet_{runid}.[txt, csv]")
-    return ss_path
+    for sheet_name in ("SampleSheet.txt", "SampleSheet.csv", f"SampleSheet_{runid}.txt", f"SampleSheet_{runid}.csv"):
+        sheet = Path(ss_path, sheet_name)
+        if sheet.exists():
+            return sheet
+    raise FileNotFoundError("Run sample sheet does not exist: " + str(ss_path) + f"/SampleSheet_{runid}.[txt, csv]")
 
 
 def mk_or_pass_dirs(*dirs):
+    # mkdir(parents=True) handles relative and unresolved paths, skip the realpath walk
     for _dir in dirs:
-        if isinstance(_dir, str):
-            _dir = Path(_dir)
-        _dir = _dir.resolve()
-        _dir.mkdir(mode=0o755, parents=True, exist_ok=True)
+        Path(_dir).mkdir(mode=0o755, parents=True, exist_ok=True)
     return True
 
 
@@ -115,12 +112,19 @@ def sniff_samplesheet(ss):
     return IllumniaSampleSheet
 
 
+@lru_cache(maxsize=128)
+def _parse_samplesheet(ss, mtime_ns):
+    parser = sniff_samplesheet(ss)
+    return parser(ss)
+
+
 def parse_samplesheet(ss):
     """
-        Parse the sample sheet into data structure
+        Parse the sample sheet into data structure, parsed sheets are cached
+        on their absolute path and modification time
     """
-    parser = sniff_samplesheet(ss)
-    return parser(ss)
+    ss = Path(ss).absolute()
+    return _parse_samplesheet(ss, ss.stat().st_mtime_ns)
 
 
 def is_dir_staged(server, run_dir):
@@ -151,52 +155,84 @@ def find_demux_dir(run_dir):
     return Path(demux_stat_files[0], '..').absolute()
 
 
+def parse_runinfo(runinfo_xml):
+    """
+        Stream parse a RunInfo.xml, returning the run id (None if missing) and
+        the text values of the elements nested directly under each run element
+    """
+    rid, run_seen, run_info, depth = None, False, {}, 0
+    for event, elem in ET.iterparse(str(runinfo_xml), events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if depth == 2 and elem.tag == 'Run' and not run_seen:
+                run_seen = True
+                rid = elem.get('Id')
+            continue
+        if depth == 3 and elem.text and elem.text.strip():
+            run_info[elem.tag] = elem.text
+        if depth > 1:
+            elem.clear()
+        depth -= 1
+    return rid, run_info
+
+
+def get_run_info(run_p, sheetname=None):
+    """
+        Gather the RunInfo.xml values and parsed sample sheet for a single
+        run directory
+    """
+    rid, run_info = parse_runinfo(Path(run_p, 'RunInfo.xml').absolute())
+    if rid is None:
+        rid = run_p.name
+    this_run_info = dict(run_id=rid)
+
+    # one directory listing instead of a stat per built-in sheet name, is_file()
+    # follows symlinks so a dangling SampleSheet.csv falls through to the next name
+    with scandir(run_p) as entries:
+        run_files = {_file.name for _file in entries if _file.is_file()}
+    for sheet_name in ('SampleSheet.csv', f'SampleSheet_{rid}.csv'):
+        if sheet_name in run_files:
+            sheet = Path(run_p, sheet_name).absolute()
+            break
+    else:
+        # user supplied names may be sub or absolute paths, check them directly
+        if sheetname and Path(run_p, sheetname).exists():
+            sheet = Path(run_p, sheetname).absolute()
+        else:
+            raise FileNotFoundError(f'Run {rid}({run_p}) does not have a find-able sample sheet.')
+    
+    this_run_info['samplesheet'] = parse_samplesheet(sheet)
+    this_run_info.update(run_info)
+    return run_p, this_run_info
+
+
 def get_run_directories(runids, seq_dir=None, sheetname=None):
     host = get_current_server()
     seq_dirs = Path(seq_dir).absolute() if seq_dir else Path(DIRECTORY_CONFIGS[host]['seqroot'])
-    seq_contents = [_child for _child in seq_dirs.iterdir()]
-    for firstchild in seq_dirs.iterdir():
-        if firstchild.is_dir():
-            for secondchild in firstchild.iterdir():
-                seq_contents.append(secondchild)
-    seq_contents_names = [child for child in map(lambda d: d.name, seq_contents)]
+    # index directories one and two levels below the sequencing root by name
+    with scandir(seq_dirs) as entries:
+        first_children = [_child for _child in entries if _child.is_dir()]
+    seq_contents = {_child.name: _child for _child in first_children}
+    for firstchild in first_children:
+        with scandir(firstchild.path) as second_children:
+            for secondchild in second_children:
+                if secondchild.is_dir():
+                    seq_contents.setdefault(secondchild.name, secondchild)
     
     run_paths, invalid_runs  = [], []
-    run_return = []
     for run in runids:
-        if Path(run).exists():
+        run_p = Path(run)
+        if run_p.exists():
             # this is a full pathrun directory
-            run_paths.append(Path(run))
-        elif run in seq_contents_names:
-            for _r in seq_contents:
-                if run == _r.name:
-                    run_paths.append(_r)
+            run_paths.append(run_p)
+        elif run in seq_contents:
+            run_paths.append(Path(seq_contents[run].path))
         else:
             invalid_runs.append(run)
 
-    for run_p in run_paths:
-        runinfo_xml = ET.parse(Path(run_p, 'RunInfo.xml').absolute())
-        try:
-            rid = runinfo_xml.find("Run").attrib['Id']
-        except (KeyError, AttributeError):
-            rid = run_p.name
-        this_run_info = dict(run_id=rid)
-
-        if Path(run_p, 'SampleSheet.csv').exists():
-            sheet = Path(run_p, 'SampleSheet.csv').absolute()
-        elif Path(run_p, f'SampleSheet_{rid}.csv').exists():
-            sheet = Path(run_p, f'SampleSheet_{rid}.csv').absolute()
-        elif Path(run_p, f'SampleSheet_{rid}.csv').exists():
-            sheet = Path(run_p, f'SampleSheet_{rid}.csv').absolute()
-        elif sheetname and Path(run_p, sheetname).exists():
-            sheet = Path(run_p, sheetname).absolute()
-        else:
-            raise FileNotFoundError(f'Run {rid}({run_p}) does not have a find-able sample sheet.')
-        
-        this_run_info['samplesheet'] = parse_samplesheet(sheet)
-        this_run_info.update({info.tag: info.text for run in runinfo_xml.getroot() for info in run \
-                             if info.text is not None and info.text.strip() not in ('\n', '')})
-        run_return.append((run_p, this_run_info))
+    # run directories are independent, overlap their file reads
+    with ThreadPoolExecutor() as executor:
+        run_return = list(executor.map(partial(get_run_info, sheetname=sheetname), run_paths))
 
     if invalid_runs:
         raise ValueError('Runs entered are invalid (missing sequencing artifacts or directory does not exist): \n' + \
@@ -174,19 +174,15 @@ class IllumniaSampleSheet():
 
     @property
     def is_paired_end(self):
-        if len(self.adapters) == 1:
+        n_adapters = len(self.adapters)
+        if n_adapters == 1:
             return False
-        elif len(self.adapters) == 2:
+        elif n_adapters == 2:
             return True
         else:
             raise ValueError('Unknown endedness from sample sheet')
 
     @property
     def is_single_end(self):
-        if len(self.adapters) == 1:
-            return True
-        elif len(self.adapters) == 2:
-            return False
-        else:
-            raise ValueError('Unknown endedness from sample sheet')
+        return not self.is_paired_end
 
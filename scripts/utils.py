@@ -9,8 +9,13 @@ import os
 import yaml
 import sys
 import textwrap
+import threading
 from argparse import ArgumentTypeError
-from dateutil.parser import parse as date_parser
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice, repeat
+from collections import defaultdict
+from datetime import datetime
 from subprocess import Popen, PIPE, STDOUT
 from pathlib import Path, PurePath
 
@@ -21,6 +26,10 @@ from .config import SNAKEFILE, DIRECTORY_CONFIGS, \
 
 
 host = get_current_server()
+RUN_ID_RE = re.compile(r"(\d{6})_([A-Z]{1,2}\d{5,6})(_\d{1,4})?_(.+)")
+JOBID_RE = re.compile(r"external jobid \'(\d+)\'")
+SBATCH_JOBID_RE = re.compile(r"(\d{5,10})")
+print_lock = threading.Lock()
 
 
 class esc_colors:
@@ -39,7 +48,36 @@ class PathJSONEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, PurePath):
             return str(obj)
-        return super(self).default(obj)
+        return super().default(obj)
+
+
+@lru_cache(maxsize=1)
+def get_server_config():
+    """
+        Return the directory configuration for the current server
+    """
+    return DIRECTORY_CONFIGS[get_current_server()]
+
+
+@lru_cache(maxsize=None)
+def get_profile_config(profile):
+    """
+        Load the snakemake profile configuration (config.yaml) from
+        `profile`, empty if the profile does not have one
+    """
+    profile_yaml = Path(profile, 'config.yaml')
+    if not profile_yaml.exists():
+        return {}
+    with open(profile_yaml) as fh:
+        return yaml.safe_load(fh) or {}
+
+
+def write_config(config, config_file):
+    """
+        Write a pipeline configuration out as JSON
+    """
+    with open(config_file, 'w') as fo:
+        json.dump(config, fo, cls=PathJSONEncoder, indent=4)
 
 
 def get_alias_table():
@@ -65,38 +103,39 @@ def valid_runid(id_to_check):
     if len(id_parts) != 4:
         raise ValueError(f"Invalid run id format: {id_to_check}")
     try:
-        # YY MM DD
-        date_parser(id_parts[0])
-    except Exception as e:
+        # YY MM DD, fixed width so no need for a general date parser
+        if len(id_parts[0]) != 6:
+            raise ValueError(id_parts[0])
+        datetime.strptime(id_parts[0], '%y%m%d')
+    except ValueError as e:
         raise ValueError('Invalid run id date') from e
     try:
         # HH MM
-        h = int(id_parts[2][0:3])
-        m = int(id_parts[2][2:])
+        h = int(id_parts[2][0:2])
+        m = int(id_parts[2][2:4])
     except ValueError as e:
         raise ValueError('Invalid run id time') from e
 
-    if h >= 25 or m >= 60:
-        raise ValueError('Invalid run id time: ' + h + m)
+    if h >= 24 or m >= 60:
+        raise ValueError(f'Invalid run id time: {id_parts[2]}')
 
     # TODO: check instruments against labkey
     return id_to_check
 
 
 def valid_run_input(run):
-    regex_run_id = r"(\d{6})_([A-Z]{1,2}\d{5,6})(_\d{1,4})?_(.+)"
-    match_id = re.search(regex_run_id, run, re.MULTILINE)
+    match_id = RUN_ID_RE.search(run)
     if match_id:
         return run
 
-    if Path(run).exists():
-        run = Path(run).absolute()
-        return run
+    run_p = Path(run).absolute()
+    if run_p.exists():
+        return run_p
 
     raise ArgumentTypeError("Invalid run value, neither an id or existing path: " + str(run))
 
 
-def exec_snakemake(popen_cmd, local=False, dry_run=False, env=None, cwd=None):
+def exec_snakemake(popen_cmd, local=False, dry_run=False, env=None, cwd=None, run_id=None):
     # async execution w/ filter: 
     #   - https://gist.github.com/DGrady/b713db14a27be0e4e8b2ffc351051c7c
     #   - https://lysator.liu.se/~bellman/download/asyncproc.py
@@ -116,31 +155,33 @@ def exec_snakemake(popen_cmd, local=False, dry_run=False, env=None, cwd=None):
 
     parent_jobid = None
     if local or dry_run:
-        popen_kwargs['env'].update(os.environ)
-        proc = Popen(map(str, popen_cmd), stdout=PIPE, stderr=STDOUT, **popen_kwargs)
+        popen_kwargs['env'] = {**popen_kwargs['env'], **os.environ}
+        # line buffered text pipe, each read blocks until snakemake emits a full line
+        proc = Popen(map(str, popen_cmd), stdout=PIPE, stderr=STDOUT, bufsize=1, encoding='utf-8', **popen_kwargs)
         for line in proc.stdout:
-            lutf8 = line.decode('utf-8')
-            jid_search = re.search(r"external jobid \'(\d+)\'", lutf8, re.MULTILINE)
+            jid_search = JOBID_RE.search(line)
             if jid_search:
                 parent_jobid = int(jid_search.group(1))
-            sys.stdout.write(lutf8)
-        snakemake_run_out, _ = proc.communicate()
+            with print_lock:
+                sys.stdout.write(line)
+        proc.wait()
     else:
-        jobscript = mk_sbatch_script(cwd, ' '.join([str(x) for x in popen_cmd]))
-        proc = Popen(['sbatch', jobscript], stdout=PIPE, stderr=STDOUT, **popen_kwargs)
+        jobscript = mk_sbatch_script(cwd, ' '.join([str(x) for x in popen_cmd]), run_id=run_id)
+        proc = Popen(['sbatch', jobscript], stdout=PIPE, stderr=STDOUT, encoding='utf-8', **popen_kwargs)
         snakemake_run_out, _ = proc.communicate()
-        jid_search = re.search(r"(\d{5,10})", snakemake_run_out.decode('utf-8'), re.MULTILINE)
+        jid_search = SBATCH_JOBID_RE.search(snakemake_run_out)
         if jid_search:
             parent_jobid = jid_search.group(1)
     mode = "local" if local or dry_run else "headless"
     if parent_jobid:
-        print(f"{esc_colors.OKGREEN}> {esc_colors.ENDC} Master job submitted in '{mode}' mode on job {esc_colors.OKGREEN}{str(parent_jobid)}{esc_colors.ENDC}")
+        with print_lock:
+            print(f"{esc_colors.OKGREEN}> {esc_colors.ENDC} Master job submitted in '{mode}' mode on job {esc_colors.OKGREEN}{str(parent_jobid)}{esc_colors.ENDC}")
     return proc.returncode == 0, parent_jobid
 
 
-def mk_sbatch_script(wd, cmd):
-    if not Path(wd, 'logs', 'masterjob').exists():
-        Path(wd, 'logs', 'masterjob').mkdir(mode=0o755, parents=True)
+def mk_sbatch_script(wd, cmd, run_id=None):
+    master_job_dir = Path(wd, 'logs', 'masterjob').absolute()
+    master_job_dir.mkdir(mode=0o755, parents=True, exist_ok=True)
     tmp_dir = get_tmp_dir(get_current_server())
     master_job_script = \
     f"""#!/bin/bash --login
@@ -158,13 +199,15 @@ def mk_sbatch_script(wd, cmd):
     master_job_script += f"if [ ! -d \"{tmp_dir}\" ]; then mkdir -p \"{tmp_dir}\"; fi\n"
     master_job_script += cmd
     master_job_script = '\n'.join([x.lstrip() for x in master_job_script.split('\n')])
-    master_script_location = Path(wd, 'logs', 'masterjob', 'master_jobscript.sh').absolute()
-    master_script_location.parent.mkdir(mode=0o755, parents=True, exist_ok=True)
+    # one job script per run, runs may share an output directory
+    master_script_name = f'master_jobscript_{run_id}.sh' if run_id else 'master_jobscript.sh'
+    master_script_location = Path(master_job_dir, master_script_name)
     with open(master_script_location, 'w') as fo:
         fo.write(master_job_script)
     return master_script_location
 
 
+@lru_cache(maxsize=None)
 def get_mods(init=False):
     mods_needed = ['snakemake', 'singularity']
     mod_cmd = []
@@ -226,45 +269,59 @@ def get_mounts(*extras):
     return ','.join(mounts)
 
 
-def exec_pipeline(configs, dry_run=False, local=False):
+def exec_pipeline(configs, dry_run=False, local=False, jobs=None):
     """
         Execute the BCL->FASTQ pipeline.
 
-        This executes the pipeline.
+        This executes the pipeline, launching up to `jobs` runs at
+        once (-1 for all available cores). By default runs are launched
+        one at a time for local and dry runs, otherwise all at once. Runs
+        that share an output directory are always launched one at a time.
     """
     this_instrument = 'Illumnia'
     snake_file = SNAKEFILE[this_instrument]['ngs_qc']
-    fastq_demux_profile = DIRECTORY_CONFIGS[get_current_server()]['profile']
-    profile_config = {}
-    if Path(fastq_demux_profile, 'config.yaml').exists():
-        profile_config.update(yaml.safe_load(open(Path(fastq_demux_profile, 'config.yaml'))))
-
-    top_singularity_dirs = [Path(c_dir, '.singularity').absolute() for c_dir in configs['out_to']]
-    top_config_dirs = [Path(c_dir, '.config').absolute() for c_dir in configs['out_to']]
-    _dirs = top_singularity_dirs + top_config_dirs
-    mk_or_pass_dirs(*_dirs)
+    fastq_demux_profile = get_server_config()['profile']
+    profile_config = get_profile_config(fastq_demux_profile)
+
+    # every per run value list must line up with the runs, fail before creating anything
     skip_config_keys = ('resources', 'runqc', 'use_scratch')
+    n_runs = len(configs['run_ids'])
+    for k, v in configs.items():
+        if v and k not in skip_config_keys and len(v) != n_runs:
+            raise ValueError(f"Configuration '{k}' has {len(v)} values, expected one per run ({n_runs})")
+
+    top_out_dirs = [Path(c_dir).absolute() for c_dir in configs['out_to']]
+    top_singularity_dirs = [Path(c_dir, '.singularity') for c_dir in top_out_dirs]
+    top_config_dirs = [Path(c_dir, '.config') for c_dir in top_out_dirs]
+    bclcon_log_dirs = [Path(c_dir, "logs", "bclconvert_demux") for c_dir in top_out_dirs]
+    _dirs = top_singularity_dirs + top_config_dirs + \
+        [log_dir for log_dir, bclcon in zip(bclcon_log_dirs, configs['bclconvert']) if bclcon]
+    mk_or_pass_dirs(*_dirs)
+    base_env = {'PATH': os.environ["PATH"]}
+
+    # transpose the per run value lists into one config per run in a single pass,
+    # the shared (skipped) keys are repeated into every run as is
+    config_keys = tuple(k for k, v in configs.items() if v)
+    config_columns = [repeat(configs[k]) if k in skip_config_keys else configs[k] for k in config_keys]
+    run_configs = [dict(zip(config_keys, row)) for row in islice(zip(*config_columns), n_runs)]
 
-    for i in range(0, len(configs['run_ids'])):
-        this_config = {k: (v[i] if k not in skip_config_keys else v) for k, v in configs.items() if v}
+    def _launch(i, this_config):
         this_config.update(profile_config)
 
         extra_to_mount = [this_config['out_to'], this_config['demux_input_dir']]
         if this_config['bclconvert']:
-            bclcon_log_dir = Path(this_config['out_to'], "logs", "bclconvert_demux")
-            if not bclcon_log_dir.exists():
-                bclcon_log_dir.mkdir(mode=0o755, parents=True)
-            extra_to_mount.append(str(bclcon_log_dir) + ":" + "/var/log/bcl-convert:rw")
+            extra_to_mount.append(str(bclcon_log_dirs[i]) + ":" + "/var/log/bcl-convert:rw")
         if this_config.get('disambiguate', False):
             extra_to_mount.append(Path(this_config['host_genome']).parent)
             extra_to_mount.append(Path(this_config['pathogen_genome']).parent)
         singularity_binds = get_mounts(*extra_to_mount)
-        config_file = Path(this_config['out_to'], '.config', f'config_job_{str(i)}.json').absolute()
-        json.dump(this_config, open(config_file, 'w'), cls=PathJSONEncoder, indent=4)
-        top_env = {}
-        top_env['PATH'] = os.environ["PATH"]
-        top_env['SNK_CONFIG'] = str(config_file.absolute())
-        top_env['SINGULARITY_CACHEDIR'] = str(Path(this_config['out_to'], '.singularity').absolute())
+        config_file = Path(top_config_dirs[i], f'config_job_{str(i)}.json')
+        write_config(this_config, config_file)
+        top_env = {
+            **base_env,
+            'SNK_CONFIG': str(config_file),
+            'SINGULARITY_CACHEDIR': str(top_singularity_dirs[i]),
+        }
         this_cmd = [
             "snakemake", "-p", "--use-singularity", "--rerun-incomplete", "--keep-incomplete",
             "--rerun-triggers", "mtime", "--verbose", "-s", snake_file,
@@ -274,17 +331,56 @@ def exec_pipeline(configs, dry_run=False, local=False):
             this_cmd.extend(["--singularity-args", f"\"--env 'TMPDIR=/tmp' -C -B '{singularity_binds}'\""])
 
         if dry_run:
-            print(f"{esc_colors.OKGREEN}> {esc_colors.ENDC}{esc_colors.UNDERLINE}Dry run{esc_colors.ENDC} " + \
-                  f"demultiplexing of run {esc_colors.BOLD}{esc_colors.OKGREEN}{this_config['run_ids']}{esc_colors.ENDC}...")
+            banner = f"{esc_colors.OKGREEN}> {esc_colors.ENDC}{esc_colors.UNDERLINE}Dry run{esc_colors.ENDC} " + \
+                     f"demultiplexing of run {esc_colors.BOLD}{esc_colors.OKGREEN}{this_config['run_ids']}{esc_colors.ENDC}..."
             this_cmd.extend(['--dry-run'])
         else:
             if not local:
                 this_cmd.extend(["--profile", fastq_demux_profile])
-            print(f"{esc_colors.OKGREEN}> {esc_colors.ENDC}Executing ngs qc pipeline for run {esc_colors.BOLD}"
-                  f"{esc_colors.OKGREEN}{this_config['run_ids']}{esc_colors.ENDC}...")
-
-        print(' '.join(map(str, this_cmd)))
-        exec_snakemake(this_cmd, local=local, dry_run=dry_run, env=top_env, cwd=str(Path(this_config['out_to']).absolute()))
+            banner = f"{esc_colors.OKGREEN}> {esc_colors.ENDC}Executing ngs qc pipeline for run {esc_colors.BOLD}" + \
+                     f"{esc_colors.OKGREEN}{this_config['run_ids']}{esc_colors.ENDC}..."
+
+        with print_lock:
+            print(banner)
+            print(' '.join(map(str, this_cmd)))
+        return exec_snakemake(this_cmd, local=local, dry_run=dry_run, env=top_env, cwd=str(top_out_dirs[i]),
+                              run_id=this_config['run_ids'])
+
+    # runs sharing an output directory share its .snakemake lock and logs, those are
+    # grouped and launched serially, the groups are independent and launched concurrently
+    run_groups = defaultdict(list)
+    for i, this_config in enumerate(run_configs):
+        run_groups[top_out_dirs[i]].append((i, this_config))
+
+    # errors are caught per run so every group runs to completion and the outcome of
+    # each run, including ones that raised before launching, is reported below
+    errors = {}
+
+    def _launch_group(group):
+        group_results = []
+        for i, this_config in group:
+            try:
+                group_results.append((i, _launch(i, this_config)))
+            except Exception as error:
+                errors[i] = f"{type(error).__name__}: {error}"
+                group_results.append((i, (False, None)))
+        return group_results
+
+    if jobs is None:
+        jobs = 1 if local or dry_run else -1
+    n_workers = min(len(run_groups), jobs if jobs > 0 else os.cpu_count())
+    results = [None] * len(run_configs)
+    with ThreadPoolExecutor(max_workers=max(n_workers, 1)) as executor:
+        for group_results in executor.map(_launch_group, run_groups.values()):
+            for i, result in group_results:
+                results[i] = result
+
+    for i, (success, _) in enumerate(results):
+        if not success:
+            reason = f": {errors[i]}" if i in errors else ""
+            print(f"{esc_colors.FAIL}> {esc_colors.ENDC}Pipeline for run {esc_colors.BOLD}{esc_colors.FAIL}" + \
+                  f"{configs['run_ids'][i]}{esc_colors.ENDC} exited with an error{reason}")
+    return results
 
 
 def is_bclconvert(samplesheet):
@@ -300,13 +396,15 @@ def valid_host_pathogen_genomes(host, pathogen):
     g1, g2 = False, False
     genomes = GENOME_CONFIGS[get_current_server()]
 
-    if Path(host).absolute().exists():
+    host_p, pathogen_p = Path(host).absolute(), Path(pathogen).absolute()
+
+    if host_p.exists():
         g1 = True
-        host = str(Path(host).absolute())
+        host = str(host_p)
 
-    if Path(pathogen).absolute().exists():
+    if pathogen_p.exists():
         g2 = True
-        pathogen = str(Path(pathogen).absolute())
+        pathogen = str(pathogen_p)
 
     if not all([g1, g2]):
         if not g1: